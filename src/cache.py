@@ -0,0 +1,142 @@
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from idset import MessageIdSet
+
+# fmt: off
+QUERY_CACHE_SIZE = 32  # listing results kept before the least recent is evicted
+# fmt: on
+
+# Listings leave these out unless they are the label being listed
+HIDDEN_LABELS = {"TRASH", "SPAM"}
+# Search operators whose result depends on the labels a message carries
+LABEL_OPERATORS = re.compile(r"\b(label|is|in|has|category):", re.IGNORECASE)
+# Search operators whose result changes with the clock, not the mailbox
+TIME_OPERATORS = re.compile(r"\b(newer_than|older_than):", re.IGNORECASE)
+
+
+def is_cacheable(key: Tuple[str, str]) -> bool:
+    """
+    Check whether a listing can be cached against the mailbox historyId.
+
+    Args:
+        key: ('query', search query) or ('label', label ID)
+
+    Returns:
+        False for queries relative to the current time, True otherwise
+    """
+    kind, value = key
+    return kind != "query" or TIME_OPERATORS.search(value) is None
+
+
+class QueryCache:
+    """
+    LRU cache of message listings keyed by query or label.
+
+    Every entry remembers the mailbox historyId it was listed at. An entry is
+    reused as is while the mailbox is unchanged and otherwise brought up to
+    date by replaying the mailbox history since then.
+    """
+
+    def __init__(self, max_entries: int = QUERY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def get(self, key: Tuple[str, str]) -> Optional[Tuple[MessageIdSet, str]]:
+        """
+        Look up a cached listing and mark it as most recently used.
+
+        Args:
+            key: ('query', search query) or ('label', label ID)
+
+        Returns:
+            A tuple of (message IDs, historyId they were listed at), or None
+        """
+        if key not in self.entries:
+            return None
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key: Tuple[str, str], messages: MessageIdSet, history_id: str):
+        """
+        Store a listing, evicting the least recently used one if the cache is full.
+
+        Args:
+            key: ('query', search query) or ('label', label ID)
+            messages: The listed message IDs
+            history_id: The mailbox historyId the listing is current for
+        """
+        if not is_cacheable(key):
+            return
+        self.entries[key] = (messages, history_id)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def discard(self, key: Tuple[str, str]):
+        """Drop a single listing from the cache."""
+        self.entries.pop(key, None)
+
+    def clear(self):
+        """Drop all cached listings."""
+        self.entries.clear()
+
+
+def apply_history(
+    key: Tuple[str, str], messages: MessageIdSet, records: List[Dict[str, Any]]
+) -> Optional[MessageIdSet]:
+    """
+    Update a cached listing with the mailbox history recorded since it was made.
+
+    Label listings can always be updated since history records carry each
+    message's labels. Search queries cannot be evaluated locally, so only
+    removals are applied to them and a new or restored message makes the
+    listing stale. For queries that filter on labels, such as in:trash or
+    is:spam, anything but a deletion makes the listing stale.
+
+    Args:
+        key: ('query', search query) or ('label', label ID)
+        messages: The cached message IDs
+        records: history.list records, oldest first
+
+    Returns:
+        The updated message IDs, or None if the listing has to be fetched again
+    """
+    kind, value = key
+    hidden = HIDDEN_LABELS - {value} if kind == "label" else HIDDEN_LABELS
+    label_dependent = kind == "query" and LABEL_OPERATORS.search(value) is not None
+    # Final membership of every message touched by the history
+    membership: Dict[str, bool] = {}
+
+    for record in records:
+        for change in record.get("messagesDeleted", []):
+            membership[change["message"]["id"]] = False
+
+        for change_type in ("messagesAdded", "labelsAdded", "labelsRemoved"):
+            for change in record.get(change_type, []):
+                message = change["message"]
+                labels = set(message.get("labelIds", []))
+
+                if kind == "label":
+                    membership[message["id"]] = value in labels and not hidden & labels
+                elif label_dependent:
+                    # e.g. in:trash or is:spam, where hidden labels add matches
+                    return None
+                elif hidden & labels:
+                    membership[message["id"]] = False
+                elif change_type == "messagesAdded":
+                    return None
+                elif change_type == "labelsRemoved" and hidden & set(
+                    change.get("labelIds", [])
+                ):
+                    # Restored from trash or spam, may match the query again
+                    return None
+
+    added = MessageIdSet.from_strings(
+        message_id for message_id, member in membership.items() if member
+    )
+    removed = MessageIdSet.from_strings(
+        message_id for message_id, member in membership.items() if not member
+    )
+    return (messages - removed) | added
@@ -9,13 +9,19 @@ from google.oauth2.credentials import Credentials
 
 # Constants
 SCOPES = ["https://www.googleapis.com/auth/gmail.modify"]
+# Permanent deletion (messages.batchDelete) requires full mailbox access
+FULL_ACCESS_SCOPES = ["https://mail.google.com/"]
 APPLICATION_NAME = "Gmail API Python"
 
 
 class GmailClient:
     """Handles authentication and service creation for Gmail API."""
 
-    def __init__(self):
+    def __init__(self, full_access: bool = False):
+        self.scopes = FULL_ACCESS_SCOPES if full_access else SCOPES
+        # Keep the full-access token separate so the default session never
+        # silently holds more privileges than it asked for
+        self.token_file = "token_full.json" if full_access else "token.json"
         self.creds = self._get_credentials()
         self.service = self._create_service()
 
@@ -23,19 +29,19 @@ class GmailClient:
         """Get user credentials for Gmail API access."""
         creds = None
 
-        if os.path.exists("token.json"):
-            creds = Credentials.from_authorized_user_file("token.json", SCOPES)
+        if os.path.exists(self.token_file):
+            creds = Credentials.from_authorized_user_file(self.token_file, self.scopes)
 
         if not creds or not creds.valid:
             if creds and creds.expired and creds.refresh_token:
                 creds.refresh(Request())
             else:
                 flow = InstalledAppFlow.from_client_secrets_file(
-                    "credentials.json", SCOPES
+                    "credentials.json", self.scopes
                 )
                 creds = flow.run_local_server(port=0)
 
-            with open("token.json", "w") as token:
+            with open(self.token_file, "w") as token:
                 token.write(creds.to_json())
 
         return creds
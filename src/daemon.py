@@ -0,0 +1,230 @@
+import base64
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Dict, List, Optional
+
+from idset import MessageIdSet
+from methods import GmailMethod, HistoryExpiredError
+
+# fmt: off
+POLL_INTERVAL = 30  # seconds between history polls without a notification
+# fmt: on
+
+RULE_ACTIONS = ("trash", "spam", "label")
+# Messages the user wrote themselves are never touched by rules
+SKIPPED_LABELS = {"SENT", "DRAFT"}
+
+
+def load_rules(path: str) -> List[Dict[str, Any]]:
+    """
+    Load cleanup rules from a JSON file.
+
+    Each rule has an action ('trash', 'spam' or 'label'), a 'from' pattern or
+    a 'domain' to match the sender against, and a 'label' name for the label
+    action, e.g. {"action": "trash", "from": "jobs@example.com"}.
+
+    Args:
+        path: Path of the JSON rules file
+
+    Returns:
+        The list of rules
+    """
+    with open(path) as rules_file:
+        rules = json.load(rules_file)
+
+    for rule in rules:
+        if rule.get("action") not in RULE_ACTIONS:
+            raise ValueError(f"Unsupported rule action: {rule.get('action')}")
+        if not rule.get("from") and not rule.get("domain"):
+            raise ValueError(f"Rule needs a 'from' or 'domain' to match: {rule}")
+        if rule["action"] == "label" and not rule.get("label"):
+            raise ValueError(f"Label rule needs a 'label' name: {rule}")
+
+    return rules
+
+
+def rule_matches(rule: Dict[str, Any], row: Dict[str, Any]) -> bool:
+    """
+    Check whether a message metadata row matches a rule.
+
+    Args:
+        rule: A cleanup rule
+        row: A message metadata row as produced by GmailMethod.get_sender
+
+    Returns:
+        True if the rule applies to the message
+    """
+    if rule.get("from") and rule["from"].lower() not in row["sender"].lower():
+        return False
+    if rule.get("domain") and rule["domain"].lower() != row["domain"]:
+        return False
+    return True
+
+
+class SyncDaemon:
+    """Applies cleanup rules to newly arriving mail by following mailbox history."""
+
+    def __init__(
+        self,
+        gmail: GmailMethod,
+        rules: List[Dict[str, Any]],
+        user_id: str = "me",
+        poll_interval: int = POLL_INTERVAL,
+    ):
+        self.gmail = gmail
+        self.rules = rules
+        self.user_id = user_id
+        self.poll_interval = poll_interval
+        self.history_id = None
+        self.rows = []
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+
+    def write(self, row: Dict[str, Any]):
+        """Collect metadata rows of new messages; called as a metadata sink."""
+        self.rows.append(row)
+
+    def notify(self):
+        """Wake the daemon up to sync right away instead of at the next poll."""
+        self.wakeup.set()
+
+    def stop(self):
+        """Stop the daemon after the current sync."""
+        self.stopped.set()
+        self.wakeup.set()
+
+    def run(self):
+        """Sync new mail until stopped, on every notification or poll interval."""
+        self.history_id = self.gmail.get_history_id(self.user_id)
+        if self.history_id is None:
+            print("Could not read the mailbox history, not starting the daemon.")
+            return
+
+        print(f"Watching for new mail from historyId {self.history_id}")
+        while not self.stopped.is_set():
+            self.wakeup.wait(self.poll_interval)
+            self.wakeup.clear()
+            if not self.stopped.is_set():
+                self.sync()
+
+    def sync(self):
+        """Fetch messages added since the last sync and apply the rules to them."""
+        try:
+            messages, latest_history_id = self.gmail.list_added_messages(
+                self.user_id, self.history_id
+            )
+        except HistoryExpiredError:
+            # The stored historyId has expired, so start over from now
+            print("Mailbox history has expired, resuming from the current state.")
+            self.history_id = self.gmail.get_history_id(self.user_id) or self.history_id
+            return
+        except Exception as error:
+            # Keep the historyId so nothing that arrived in the meantime is lost
+            print(f"Could not sync, retrying at the next wakeup: {error}")
+            return
+
+        self.history_id = latest_history_id or self.history_id
+        if messages:
+            self.apply_rules(messages)
+
+    def apply_rules(self, messages: MessageIdSet):
+        """
+        Apply the configured rules to a set of new messages.
+
+        Trash and spam rules are exclusive: the first matching one wins.
+        Label rules are applied to every message they match.
+
+        Args:
+            messages: IDs of the newly arrived messages
+        """
+        # Fetching metadata adds senders to gmail.users; keep that list as
+        # it was so the session's sender statistics are not skewed
+        known_senders = len(self.gmail.users)
+        self.rows = []
+        self.gmail.metadata_sinks.append(self)
+        try:
+            self.gmail.batch_get(messages, self.user_id)
+        finally:
+            self.gmail.metadata_sinks.remove(self)
+            del self.gmail.users[known_senders:]
+
+        rows = [row for row in self.rows if not SKIPPED_LABELS & set(row["labels"])]
+        handled = MessageIdSet()
+
+        for rule in self.rules:
+            matched = MessageIdSet.from_strings(
+                row["id"] for row in rows if rule_matches(rule, row)
+            )
+            if rule["action"] != "label":
+                matched = matched - handled
+            if not matched:
+                continue
+
+            if rule["action"] == "trash":
+                self.gmail.batch_delete(matched, self.user_id)
+                handled = handled | matched
+            elif rule["action"] == "spam":
+                self.gmail.batch_spam(matched, self.user_id)
+                handled = handled | matched
+            else:
+                label_id = self._label_id(rule["label"])
+                if label_id:
+                    self.gmail.batch_label(matched, label_id, self.user_id)
+
+            print(f"Applied {rule['action']} rule to {len(matched)} new e-mails.")
+
+    def _label_id(self, label_name: str) -> Optional[str]:
+        """Look up a rule's label, creating it if it does not exist yet."""
+        label_id = self.gmail.get_label_id(self.user_id, label_name)
+        if label_id is None:
+            label_id = self.gmail.create_label(self.user_id, label_name).get("id")
+        return label_id
+
+
+class NotificationHandler(BaseHTTPRequestHandler):
+    """
+    Receives Gmail push notifications and wakes up the daemon.
+
+    Accepts the Pub/Sub push envelope Gmail's users.watch delivers, but any
+    POST counts as a notification so a local stand-in can simply send '{}'.
+    """
+
+    daemon: Optional[SyncDaemon] = None
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+
+        try:
+            data = json.loads(body or b"{}").get("message", {}).get("data")
+            if data:
+                payload = json.loads(base64.b64decode(data))
+                print(f"Push notification for historyId {payload.get('historyId')}")
+        except (ValueError, AttributeError):
+            pass
+
+        self.daemon.notify()
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *_args):
+        # Keep the request log out of the progress output
+        pass
+
+
+def serve_notifications(daemon: SyncDaemon, port: int) -> HTTPServer:
+    """
+    Start a local endpoint that feeds push notifications to the daemon.
+
+    Args:
+        daemon: The daemon to wake up on every notification
+        port: Local port to listen on
+
+    Returns:
+        The running server; call shutdown() on it to stop it
+    """
+    handler = type("Handler", (NotificationHandler,), {"daemon": daemon})
+    server = HTTPServer(("localhost", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
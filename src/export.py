@@ -0,0 +1,184 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+# fmt: off
+EXPORT_BATCH_ROWS = 10000  # rows buffered before a record batch is written
+# fmt: on
+
+
+def _require_pyarrow():
+    """Import pyarrow, which is only needed for exporting and reports."""
+    try:
+        import pyarrow
+    except ImportError as error:
+        raise ImportError(
+            "Exporting mailbox metadata requires pyarrow from the 'export' extra. "
+            "Install it with: uv sync --extra export"
+        ) from error
+    return pyarrow
+
+
+def _schema(pa):
+    """Arrow schema of the exported metadata."""
+    return pa.schema(
+        [
+            ("id", pa.string()),
+            ("thread_id", pa.string()),
+            ("sender", pa.string()),
+            ("domain", pa.string()),
+            ("labels", pa.list_(pa.string())),
+            ("internal_date", pa.timestamp("ms")),
+            ("size_estimate", pa.int64()),
+        ]
+    )
+
+
+def _is_arrow_ipc(path: str) -> bool:
+    """Whether a path should be written as Arrow IPC instead of Parquet."""
+    return path.endswith((".arrow", ".feather", ".ipc"))
+
+
+class MetadataExporter:
+    """Streams message metadata rows to a Parquet or Arrow IPC file."""
+
+    def __init__(self, path: str):
+        self.pa = _require_pyarrow()
+        self.path = path
+        self.schema = _schema(self.pa)
+        self.rows: List[Dict[str, Any]] = []
+        self.written = 0
+
+        if _is_arrow_ipc(path):
+            self.writer = self.pa.ipc.new_file(path, self.schema)
+        else:
+            import pyarrow.parquet as pq
+
+            self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def write(self, row: Dict[str, Any]):
+        """
+        Buffer a metadata row and write it out once a full batch is collected.
+
+        Args:
+            row: A message metadata row keyed by the schema's column names
+        """
+        self.rows.append(row)
+        if len(self.rows) >= EXPORT_BATCH_ROWS:
+            self.flush()
+
+    def flush(self):
+        """Write all buffered rows as one record batch."""
+        if not self.rows:
+            return
+
+        batch = self.pa.RecordBatch.from_pylist(self.rows, schema=self.schema)
+        self.writer.write_batch(batch)
+        self.written += len(self.rows)
+        self.rows = []
+
+    def close(self):
+        """Flush the remaining rows and finish the file."""
+        self.flush()
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc):
+        self.close()
+
+
+def load_metadata(path: str):
+    """
+    Load an exported metadata file.
+
+    Args:
+        path: Path of a Parquet or Arrow IPC file written by MetadataExporter
+
+    Returns:
+        A pyarrow Table with the exported columns
+    """
+    pa = _require_pyarrow()
+
+    if _is_arrow_ipc(path):
+        with pa.memory_map(path) as source:
+            return pa.ipc.open_file(source).read_all()
+
+    import pyarrow.parquet as pq
+
+    return pq.read_table(path)
+
+
+def _group_totals(table, key: str, sort_by: str, limit: Optional[int] = None):
+    """
+    Count messages and sum their sizes per value of a column.
+
+    Args:
+        table: A metadata table
+        key: The column to group by
+        sort_by: 'count' or 'bytes', the total to sort descending by
+        limit: Maximum number of groups to return (default all)
+
+    Returns:
+        A list of (key, message count, total bytes) tuples
+    """
+    totals = table.group_by(key).aggregate([("id", "count"), ("size_estimate", "sum")])
+    column = {"count": "id_count", "bytes": "size_estimate_sum"}[sort_by]
+    totals = totals.sort_by([(column, "descending")])
+    if limit is not None:
+        totals = totals.slice(0, limit)
+
+    return list(
+        zip(
+            totals[key].to_pylist(),
+            totals["id_count"].to_pylist(),
+            totals["size_estimate_sum"].to_pylist(),
+        )
+    )
+
+
+def top_senders_by_count(table, limit: int) -> List[Tuple[str, int, int]]:
+    """
+    Rank senders by the number of messages they sent.
+
+    Args:
+        table: A metadata table
+        limit: Number of senders to return
+
+    Returns:
+        A list of (sender, message count, total bytes) tuples
+    """
+    return _group_totals(table, "sender", "count", limit)
+
+
+def top_senders_by_bytes(table, limit: int) -> List[Tuple[str, int, int]]:
+    """
+    Rank senders by the total size of the messages they sent.
+
+    Args:
+        table: A metadata table
+        limit: Number of senders to return
+
+    Returns:
+        A list of (sender, message count, total bytes) tuples
+    """
+    return _group_totals(table, "sender", "bytes", limit)
+
+
+def volume_per_month(table) -> List[Tuple[str, int, int]]:
+    """
+    Count messages and bytes received per month.
+
+    Args:
+        table: A metadata table
+
+    Returns:
+        A list of (YYYY-MM, message count, total bytes) tuples, oldest first
+    """
+    pa = _require_pyarrow()
+    import pyarrow.compute as pc
+
+    months = pc.strftime(table["internal_date"], format="%Y-%m")
+    monthly = pa.table(
+        {"month": months, "id": table["id"], "size_estimate": table["size_estimate"]}
+    )
+    return sorted(_group_totals(monthly, "month", "count"))
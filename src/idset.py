@@ -0,0 +1,124 @@
+from array import array
+from typing import Iterable, Iterator, List
+
+import numpy as np
+
+
+def _unique_sorted(packed: np.ndarray) -> np.ndarray:
+    """Sort an array and drop duplicate IDs."""
+    packed = np.sort(packed)
+    if len(packed) < 2:
+        return packed
+    keep = np.empty(len(packed), dtype=bool)
+    keep[0] = True
+    np.not_equal(packed[1:], packed[:-1], out=keep[1:])
+    return packed[keep]
+
+
+class MessageIdSet:
+    """
+    A set of Gmail message IDs packed as a sorted NumPy uint64 array.
+
+    Message IDs are 16 hex digits, so each one fits in 8 bytes instead of a
+    full string object. Set operations run on the sorted arrays in NumPy, and
+    IDs are only turned back into strings when they are handed to the API,
+    one chunk at a time.
+    """
+
+    def __init__(self, ids: Iterable[int] = ()):
+        if isinstance(ids, (array, np.ndarray)):
+            packed = np.asarray(ids, dtype=np.uint64)
+        else:
+            packed = np.fromiter(ids, dtype=np.uint64)
+        self._ids = _unique_sorted(packed)
+
+    @classmethod
+    def _from_sorted(cls, packed: np.ndarray) -> "MessageIdSet":
+        """Wrap an array that is already sorted and free of duplicates."""
+        id_set = cls()
+        id_set._ids = packed
+        return id_set
+
+    @classmethod
+    def from_strings(cls, ids: Iterable[str]) -> "MessageIdSet":
+        """
+        Build a set from message IDs as returned by the API.
+
+        Args:
+            ids: Hexadecimal message ID strings
+
+        Returns:
+            A MessageIdSet holding the unique IDs
+        """
+        return cls(int(message_id, 16) for message_id in ids)
+
+    @staticmethod
+    def pack(message_id: str) -> int:
+        """Convert a hexadecimal message ID to its integer form."""
+        return int(message_id, 16)
+
+    @staticmethod
+    def unpack(packed_id: int) -> str:
+        """Convert an integer message ID back to the API's hexadecimal form."""
+        return format(packed_id, "x")
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self) -> Iterator[str]:
+        return (self.unpack(packed_id) for packed_id in self._ids.tolist())
+
+    def __contains__(self, message_id: str) -> bool:
+        packed_id = np.uint64(self.pack(message_id))
+        index = np.searchsorted(self._ids, packed_id)
+        return bool(index < len(self._ids) and self._ids[index] == packed_id)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, MessageIdSet):
+            return NotImplemented
+        return np.array_equal(self._ids, other._ids)
+
+    def __repr__(self) -> str:
+        return f"MessageIdSet({len(self)} ids)"
+
+    def __or__(self, other: "MessageIdSet") -> "MessageIdSet":
+        return self.union(other)
+
+    def __sub__(self, other: "MessageIdSet") -> "MessageIdSet":
+        return self.difference(other)
+
+    def union(self, other: "MessageIdSet") -> "MessageIdSet":
+        """Return the IDs that are in either set."""
+        if not other:
+            return self
+        if not self:
+            return other
+        return self._from_sorted(
+            _unique_sorted(np.concatenate((self._ids, other._ids)))
+        )
+
+    def difference(self, other: "MessageIdSet") -> "MessageIdSet":
+        """Return the IDs in this set that are not in the other one."""
+        if not other or not self:
+            return self
+        return self._from_sorted(
+            np.setdiff1d(self._ids, other._ids, assume_unique=True)
+        )
+
+    def chunks(self, size: int) -> Iterator[List[str]]:
+        """
+        Iterate over the IDs as lists of strings ready to be sent to the API.
+
+        Args:
+            size: Maximum number of IDs per chunk
+
+        Yields:
+            Lists of at most size hexadecimal message IDs
+        """
+        for start in range(0, len(self._ids), size):
+            chunk = self._ids[start : start + size].tolist()
+            yield [self.unpack(packed_id) for packed_id in chunk]
+
+    def nbytes(self) -> int:
+        """Memory used by the packed IDs in bytes."""
+        return self._ids.nbytes
@@ -1,13 +1,46 @@
-import re
 import sys
 from collections import Counter
 
-from methods import GmailMethod
+from daemon import SyncDaemon, load_rules, serve_notifications
+from export import (
+    MetadataExporter,
+    load_metadata,
+    top_senders_by_bytes,
+    top_senders_by_count,
+    volume_per_month,
+)
+from methods import GmailMethod, sender_address
+from planner import ReclaimPlanner
+
+
+def scan_mailbox(gmail: GmailMethod, sinks: list):
+    """Fetch the metadata of every message, feeding each one to the given sinks."""
+    gmail.users = []
+    gmail.total_messages = 0
+    [messages, _history] = gmail.list_messages("me")
+
+    gmail.metadata_sinks.extend(sinks)
+    try:
+        gmail.batch_get(messages)
+    finally:
+        for sink in sinks:
+            gmail.metadata_sinks.remove(sink)
+
+
+def describe_target(gmail: GmailMethod, target: dict) -> str:
+    """Describe a planner target, showing label names rather than label IDs."""
+    name = gmail.label_names_by_id.get(target["name"], target["name"])
+    return (
+        f"{target['kind']} {name}: {target['count']} e-mails, "
+        f"{target['bytes'] / 1e6:.1f} MB for {target['cost']} quota units "
+        f"({target['bytes_per_unit'] / 1e3:.1f} KB per unit)"
+    )
 
 
 def main():
     """Main function to run the Gmail Cleaner."""
     gmail = GmailMethod()
+    planner = ReclaimPlanner()
 
     while True:
         print("""
@@ -17,7 +50,12 @@ def main():
 4. Move all messages from the spam to the trash folder
 5. Move messages matching a specific label to trash
 6. Add a label to emails matching a specified sender
-7. Exit
+7. Permanently delete messages (purge)
+8. Export mailbox metadata to a columnar file
+9. Show reports from an exported metadata file
+10. Apply rules to new mail as it arrives (sync daemon)
+11. Plan and run a permanent cleanup ranked by bytes freed per quota unit
+12. Exit
         """)
 
         try:
@@ -26,8 +64,8 @@ def main():
             if user_choice == 1:
                 # Show the most common senders
                 if not gmail.users:
-                    [messages, _history] = gmail.list_messages("me")
-                    gmail.batch_get(messages)
+                    planner.reset()
+                    scan_mailbox(gmail, [planner])
 
                 sender_counts = Counter(gmail.users).most_common()
                 num_senders = int(input("How many senders do you want to display? "))
@@ -36,12 +74,8 @@ def main():
                 gmail.total_from_users = 0
 
                 for sender, count in sender_counts[:num_senders]:
-                    # Extract email from sender string
-                    email_match = re.search(r"(?<=<)(.*)(?=>)", sender)
-                    display_sender = email_match.group() if email_match else sender
-
                     gmail.total_from_users += count
-                    print(f"- {count} e-mails from {display_sender}.")
+                    print(f"- {count} e-mails from {sender_address(sender)}.")
 
                 print(f"In total you have {gmail.total_messages} e-mails.")
 
@@ -81,6 +115,10 @@ def main():
 
             elif user_choice == 4:
                 # Move all spam to trash (using batch processing)
+                spam_size = gmail.get_label_counts("me", ["SPAM"]).get("SPAM", {})
+                if spam_size:
+                    print(f"Spam contains {spam_size['messagesTotal']} e-mails.")
+
                 messages = gmail.list_messages_matching_label("me", "SPAM")
 
                 if not messages:
@@ -102,12 +140,24 @@ def main():
                     "n",
                 ]:
                     print("You have these labels:")
+                    label_counts = gmail.get_label_counts("me")
                     for label in gmail.list_labels("me"):
-                        print(f"Label: {label['name']}; ID: {label['id']}")
+                        size = label_counts.get(label["id"], {})
+                        print(
+                            f"Label: {label['name']}; ID: {label['id']}; "
+                            f"{size.get('messagesTotal', '?')} e-mails in "
+                            f"{size.get('threadsTotal', '?')} threads"
+                        )
 
                 label_id = input(
                     "Messages matching what label ID do you want to delete? "
                 )
+                label_size = gmail.get_label_counts("me", [label_id]).get(label_id)
+                if label_size:
+                    print(
+                        f"Label {gmail.label_names_by_id.get(label_id, label_id)} "
+                        f"contains {label_size['messagesTotal']} e-mails."
+                    )
                 messages = gmail.list_messages_matching_label("me", label_id)
 
                 if not messages:
@@ -128,15 +178,12 @@ def main():
                 )
 
                 # Check if label exists, create if not
-                labels = gmail.list_labels("me")
-                if not gmail.label_check(labels, label_name):
+                if not gmail.label_check("me", label_name):
                     label_info = gmail.create_label("me", label_name)
                     label_id = label_info["id"]
                     print(f"Created new label: {label_name}")
                 else:
-                    label_id = next(
-                        label["id"] for label in labels if label["name"] == label_name
-                    )
+                    label_id = gmail.get_label_id("me", label_name)
 
                 messages = gmail.list_messages_matching_query("me", f"from:{sender}")
 
@@ -150,6 +197,160 @@ def main():
                 print(f'Attached the label: "{label_name}" to {gmail.labels} e-mails.')
 
             elif user_choice == 7:
+                # Permanently delete messages (using batchDelete)
+                print("""
+a. Purge the trash folder
+b. Purge the spam folder
+c. Purge messages matching a search query
+                """)
+                target = input("What do you want to purge? ").lower()
+
+                if target == "a":
+                    description = "in the trash"
+                    messages = gmail.list_messages_matching_label("me", "TRASH")
+                elif target == "b":
+                    description = "in spam"
+                    messages = gmail.list_messages_matching_label("me", "SPAM")
+                elif target == "c":
+                    query = input("Enter the search query: ")
+                    description = f"matching '{query}'"
+                    messages = gmail.list_messages_matching_query("me", query)
+                else:
+                    print("Invalid option! Please try again.")
+                    continue
+
+                if not messages:
+                    print(f"No messages found {description}")
+                    continue
+
+                print(
+                    f"{len(messages)} e-mails {description} will be deleted "
+                    "permanently. This cannot be undone."
+                )
+                if input('Type "DELETE" to confirm: ') != "DELETE":
+                    print("Purge cancelled.")
+                    continue
+
+                gmail.deleted = 0
+                gmail.purge_quota_used = 0
+                gmail.batch_purge(messages)
+
+                print(
+                    f"Permanently deleted {gmail.deleted} e-mails "
+                    f"using {gmail.purge_quota_used} quota units."
+                )
+
+            elif user_choice == 8:
+                # Stream message metadata into a Parquet or Arrow IPC file
+                path = input("Export to which file? (default mailbox.parquet) ")
+                path = path or "mailbox.parquet"
+
+                planner.reset()
+                with MetadataExporter(path) as exporter:
+                    scan_mailbox(gmail, [exporter, planner])
+
+                print(f"Exported metadata of {exporter.written} e-mails to {path}.")
+
+            elif user_choice == 9:
+                # Group-by reports over an exported metadata file
+                path = input("Which export? (default mailbox.parquet) ")
+                table = load_metadata(path or "mailbox.parquet")
+                num_senders = int(input("How many senders do you want to display? "))
+
+                print("Top senders by number of e-mails:")
+                for sender, count, size in top_senders_by_count(table, num_senders):
+                    print(f"- {count} e-mails ({size / 1e6:.1f} MB) from {sender}.")
+
+                print("Top senders by size:")
+                for sender, count, size in top_senders_by_bytes(table, num_senders):
+                    print(f"- {size / 1e6:.1f} MB ({count} e-mails) from {sender}.")
+
+                print("Volume per month:")
+                for month, count, size in volume_per_month(table):
+                    print(f"- {month}: {count} e-mails, {size / 1e6:.1f} MB")
+
+                print(f"In total the export holds {table.num_rows} e-mails.")
+
+            elif user_choice == 10:
+                # Follow mailbox history and apply rules to new messages only
+                path = input("Which rules file? (default rules.json) ")
+                rules = load_rules(path or "rules.json")
+                port = input("Port for push notifications (leave empty to poll): ")
+
+                daemon = SyncDaemon(gmail, rules)
+                server = serve_notifications(daemon, int(port)) if port else None
+
+                print("Sync daemon running. Press Ctrl+C to stop.")
+                try:
+                    daemon.run()
+                finally:
+                    daemon.stop()
+                    if server:
+                        server.shutdown()
+
+            elif user_choice == 11:
+                # Rank purge targets by storage freed and run the best ones
+                if not gmail.users:
+                    planner.reset()
+                    scan_mailbox(gmail, [planner])
+
+                num_steps = int(input("How many senders, domains or labels? "))
+                steps = planner.plan(num_steps)
+                if not steps:
+                    print("Nothing to clean up.")
+                    continue
+
+                gmail.list_labels("me")
+                print(
+                    f"Left out {planner.protected} sent, draft, starred or "
+                    "important e-mails."
+                )
+
+                print("Largest by total size:")
+                for number, target in enumerate(planner.rank("bytes")[:num_steps], 1):
+                    print(f"{number}. {describe_target(gmail, target)}")
+
+                print("Largest by bytes per quota unit:")
+                for number, target in enumerate(planner.rank()[:num_steps], 1):
+                    print(f"{number}. {describe_target(gmail, target)}")
+
+                print(
+                    "Purge plan, each step the best bytes per quota unit of what is left:"
+                )
+                for number, step in enumerate(steps, 1):
+                    print(f"{number}. {describe_target(gmail, step)}")
+
+                total_bytes = sum(step["bytes"] for step in steps)
+                total_cost = sum(step["cost"] for step in steps)
+                print(
+                    f"In total {total_bytes / 1e6:.1f} MB for {total_cost} quota units."
+                )
+
+                print("Purged e-mails are deleted permanently. This cannot be undone.")
+                if input('Type "DELETE" to confirm: ') != "DELETE":
+                    print("Plan cancelled.")
+                    continue
+
+                gmail.deleted = 0
+                gmail.purge_quota_used = 0
+                freed_bytes = 0
+                for number, step in enumerate(steps, 1):
+                    if gmail.batch_purge(step["messages"]) == step["count"]:
+                        freed_bytes += step["bytes"]
+                    else:
+                        print(f"Step {number} was not purged completely.")
+
+                print(
+                    f"Permanently deleted {gmail.deleted} e-mails, freeing at least "
+                    f"{freed_bytes / 1e6:.1f} MB "
+                    f"for {gmail.purge_quota_used} quota units."
+                )
+
+                # The scan no longer reflects the mailbox
+                gmail.users = []
+                planner.reset()
+
+            elif user_choice == 12:
                 # Exit
                 print("Exiting Gmail Cleaner. Goodbye!")
                 sys.exit(0)
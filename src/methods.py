@@ -1,24 +1,50 @@
+import math
 import random
+import re
 import time
-from typing import Any, Dict, List, Optional, Tuple
+from array import array
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from googleapiclient.errors import HttpError
 from tqdm import tqdm
 
+from cache import QueryCache, apply_history, is_cacheable
 from client import GmailClient
+from idset import MessageIdSet
 
 # fmt: off
 # https://developers.google.com/gmail/api/reference/quota#per-method_quota_usage
-TRASH_BATCH_SIZE = 20   # messages.trash is 5 units
-LIST_BATCH_SIZE = 20    # messages.list is 5 units
-MODIFY_BATCH_SIZE = 20  # messages.modify is 5 units
-DELETE_BATCH_SIZE = 10  # messages.delete is 10 units
-SPAM_BATCH_SIZE = 20    # uses batchModify which is 5 units
-LABEL_BATCH_SIZE = 20   # uses batchModify which is 5 units
-GET_BATCH_SIZE = 20     # messages.get is 5 units
+TRASH_BATCH_SIZE = 20        # uses batchModify which is 50 units
+LIST_BATCH_SIZE = 20         # messages.list is 5 units
+MODIFY_BATCH_SIZE = 20       # messages.modify is 5 units
+DELETE_BATCH_SIZE = 1000     # messages.batchDelete takes up to 1000 ids
+SPAM_BATCH_SIZE = 20         # uses batchModify which is 50 units
+LABEL_BATCH_SIZE = 20        # uses batchModify which is 50 units
+GET_BATCH_SIZE = 20          # messages.get is 5 units
+LABEL_GET_BATCH_SIZE = 50    # labels.get is 1 unit
+
+BATCH_DELETE_QUOTA_UNITS = 50  # messages.batchDelete is 50 units per call
 # fmt: on
 
 
+class HistoryExpiredError(Exception):
+    """Raised when a historyId is too old for history.list to start from."""
+
+
+def sender_address(sender: str) -> str:
+    """
+    Extract the e-mail address from a From header value.
+
+    Args:
+        sender: A header value such as 'Jane Doe <jane@example.com>'
+
+    Returns:
+        The bare e-mail address, or the value unchanged if it has no brackets
+    """
+    email_match = re.search(r"(?<=<)(.*)(?=>)", sender)
+    return email_match.group() if email_match else sender
+
+
 class GmailMethod:
     """Provides methods for interacting with Gmail."""
 
@@ -33,13 +59,22 @@ class GmailMethod:
         self.moved_to_spam = 0
         self.deleted = 0
         self.labels = 0
+        self.purge_quota_used = 0
+        self.purge_client = None
+        self.label_catalog = None
+        self.label_ids_by_name = {}
+        self.label_names_by_id = {}
+        self.label_counts = {}
+        self.label_counts_history_id = None
+        self.metadata_sinks = []
+        self.query_cache = QueryCache()
 
     def list_messages(
         self,
         user_id: str,
         query: Optional[str] = None,
         only_newer_than: Optional[str] = None,
-    ) -> Tuple[List[str], Optional[str]]:
+    ) -> Tuple[MessageIdSet, Optional[str]]:
         """
         Lists messages in the user's mailbox with filtering options.
 
@@ -49,62 +84,15 @@ class GmailMethod:
             only_newer_than: Optional historyId to fetch only messages newer than this ID
 
         Returns:
-            A tuple containing (list of message IDs, latest historyId)
+            A tuple containing (set of message IDs, latest historyId)
         """
         try:
-            messages = []
+            messages = array("Q")
             latest_history_id = None
 
             # Handle incremental updates with history
-            # NOTE: currently unused
             if only_newer_than:
-                history_response = (
-                    self.gmailclient.service.users()
-                    .history()
-                    .list(userId=user_id, startHistoryId=only_newer_than)
-                    .execute()
-                )
-
-                if "history" in history_response:
-                    pbar = tqdm(desc="Processing history changes", unit="pages")
-                    pbar.update(1)
-
-                    for history in history_response["history"]:
-                        if "messagesAdded" in history:
-                            for msg in history["messagesAdded"]:
-                                messages.append(msg["message"]["id"])
-
-                    latest_history_id = history_response.get("historyId")
-
-                    while "nextPageToken" in history_response:
-                        page_token = history_response["nextPageToken"]
-                        history_response = (
-                            self.gmailclient.service.users()
-                            .history()
-                            .list(
-                                userId=user_id,
-                                startHistoryId=only_newer_than,
-                                pageToken=page_token,
-                            )
-                            .execute()
-                        )
-
-                        if "history" in history_response:
-                            for history in history_response["history"]:
-                                if "messagesAdded" in history:
-                                    for msg in history["messagesAdded"]:
-                                        messages.append(msg["message"]["id"])
-
-                        pbar.update(1)
-                        latest_history_id = history_response.get(
-                            "historyId", latest_history_id
-                        )
-
-                    pbar.close()
-
-                messages = list(set(messages))
-                self.total_messages = len(messages)
-                return messages, latest_history_id
+                return self.list_added_messages(user_id, only_newer_than)
 
             # Handle regular listing
             params = {}
@@ -122,7 +110,9 @@ class GmailMethod:
                 pbar = tqdm(desc="Fetching message pages", unit="pages")
                 pbar.update(1)
 
-                messages.extend(message["id"] for message in response["messages"])
+                messages.extend(
+                    MessageIdSet.pack(message["id"]) for message in response["messages"]
+                )
                 self.total_messages += len(response["messages"])
                 pbar.set_postfix({"emails": self.total_messages})
 
@@ -149,7 +139,8 @@ class GmailMethod:
 
                     if "messages" in response:
                         messages.extend(
-                            message["id"] for message in response["messages"]
+                            MessageIdSet.pack(message["id"])
+                            for message in response["messages"]
                         )
                         self.total_messages += len(response["messages"])
 
@@ -158,16 +149,113 @@ class GmailMethod:
 
                 pbar.close()
 
-            return messages, latest_history_id
+            return MessageIdSet(messages), latest_history_id
 
         except Exception as error:
             print(f"An error occurred at list_messages: {error}")
-            return [], None
+            return MessageIdSet(), None
+
+    def list_added_messages(
+        self, user_id: str, start_history_id: str
+    ) -> Tuple[MessageIdSet, Optional[str]]:
+        """
+        List messages added to the mailbox since a historyId.
+
+        Unlike the other listing methods, errors are raised rather than
+        printed, so callers can tell an expired historyId from a failed call.
+
+        Args:
+            user_id: The user's email address
+            start_history_id: The historyId to list additions after
+
+        Returns:
+            A tuple containing (set of message IDs, latest historyId)
+
+        Raises:
+            HistoryExpiredError: If start_history_id is too old to list from
+            HttpError: For any other failed request
+        """
+        messages = array("Q")
+        params = {
+            "userId": user_id,
+            "startHistoryId": start_history_id,
+            "historyTypes": "messageAdded",
+        }
+        latest_history_id = None
+        # Only shown once there is more than one page, so the daemon's
+        # regular polls of an unchanged mailbox stay quiet
+        pbar = None
+
+        try:
+            while True:
+                try:
+                    history_response = (
+                        self.gmailclient.service.users()
+                        .history()
+                        .list(**params)
+                        .execute()
+                    )
+                except HttpError as error:
+                    if error.resp.status == 404:
+                        raise HistoryExpiredError(start_history_id) from error
+                    raise
+
+                # Present even when nothing changed, so callers can advance
+                latest_history_id = history_response.get("historyId", latest_history_id)
+                for history in history_response.get("history", []):
+                    for msg in history.get("messagesAdded", []):
+                        messages.append(MessageIdSet.pack(msg["message"]["id"]))
+
+                if "nextPageToken" not in history_response:
+                    if pbar is not None:
+                        pbar.update(1)
+                    return MessageIdSet(messages), latest_history_id
+                params["pageToken"] = history_response["nextPageToken"]
+
+                if pbar is None:
+                    pbar = tqdm(desc="Processing history changes", unit="pages")
+                pbar.update(1)
+        finally:
+            if pbar is not None:
+                pbar.close()
+
+    def get_history_id(self, user_id: str) -> Optional[str]:
+        """
+        Get the mailbox's current historyId.
+
+        Args:
+            user_id: The user's email address
+
+        Returns:
+            The latest historyId, or None if it could not be fetched
+        """
+        try:
+            profile = (
+                self.gmailclient.service.users().getProfile(userId=user_id).execute()
+            )
+            return profile.get("historyId")
+        except Exception as error:
+            print(f"An error occurred at get_history_id: {error}")
+            return None
+
+    def _purge_service(self):
+        """
+        Get a service object with full mailbox access for permanent deletion.
+
+        The full-access client is only created on first use so regular
+        sessions keep running with the narrower gmail.modify scope.
+        """
+        if self.purge_client is None:
+            self.purge_client = GmailClient(full_access=True)
+        return self.purge_client.service
 
     def get_sender(self, request_id, response, exception):
         """
         Callback function for batch requests that extracts sender information.
 
+        When metadata sinks are registered, every message is also passed to
+        them as a row of ID, thread, sender, domain, labels, date and size.
+
         Args:
             request_id: Unique ID of the request
             response: The returned Gmail message object
@@ -179,15 +267,49 @@ class GmailMethod:
 
         try:
             if response and "payload" in response and "headers" in response["payload"]:
+                sender = ""
                 for header in response["payload"]["headers"]:
                     if header["name"] == "From":
-                        self.users.append(header.get("value"))
+                        sender = header.get("value")
+                        self.users.append(sender)
                         break
+
+                if self.metadata_sinks:
+                    address = sender_address(sender)
+                    row = {
+                        "id": response.get("id", request_id),
+                        "thread_id": response.get("threadId"),
+                        "sender": address,
+                        "domain": address.rpartition("@")[2].lower(),
+                        "labels": response.get("labelIds", []),
+                        "internal_date": int(response.get("internalDate", 0)),
+                        "size_estimate": response.get("sizeEstimate", 0),
+                    }
+                    for sink in self.metadata_sinks:
+                        sink.write(row)
             else:
                 print(f"Missing expected fields in response for message {request_id}")
         except Exception as error:
             print(f"An error occurred at get_sender for message {request_id}: {error}")
 
+    def store_label_counts(self, request_id, response, exception):
+        """
+        Callback function for batch requests that stores per-label counts.
+
+        Args:
+            request_id: The label ID the request was made for
+            response: The returned Gmail label object
+            exception: Exception object if an error occurred
+        """
+        if exception:
+            print(f"An error occurred fetching label {request_id}: {exception}")
+            return
+
+        self.label_counts[request_id] = {
+            "messagesTotal": response.get("messagesTotal", 0),
+            "threadsTotal": response.get("threadsTotal", 0),
+        }
+
     def _generic_callback(self, request_id, _response, exception, operation: str):
         """
         Generic callback for batch operations.
@@ -212,13 +334,16 @@ class GmailMethod:
 
         return True
 
-    def batch_process(self, items: List[str], operation: str, **kwargs):
+    def batch_process(
+        self, items: Union[MessageIdSet, List[str]], operation: str, **kwargs
+    ):
         """
         Generic batch processing function for Gmail API operations with exponential backoff.
 
         Args:
-            items: List of IDs or items to process
-            operation: Operation type ('trash', 'spam', 'label', 'get')
+            items: Set of message IDs, or list of other IDs, to process
+            operation: Operation type ('trash', 'spam', 'label', 'get', 'purge',
+                'label_info')
             **kwargs: Additional arguments needed for specific operations
                 - user_id: The user's email address (default 'me')
                 - label_id: The label ID (for 'label' operation)
@@ -234,6 +359,10 @@ class GmailMethod:
             batch_size = LABEL_BATCH_SIZE
         elif operation == "get":
             batch_size = GET_BATCH_SIZE
+        elif operation == "purge":
+            batch_size = DELETE_BATCH_SIZE
+        elif operation == "label_info":
+            batch_size = LABEL_GET_BATCH_SIZE
         else:
             batch_size = 20
 
@@ -284,6 +413,26 @@ class GmailMethod:
                 "uses_batch_http": False,
                 "desc": "Getting messages",
             },
+            "purge": {
+                "process_batch": lambda batch: self._purge_service()
+                .users()
+                .messages()
+                .batchDelete(userId=user_id, body={"ids": batch})
+                .execute(),
+                "uses_batch_http": True,
+                "desc": "Permanently deleting",
+                "counter": "deleted",
+                "quota_units": BATCH_DELETE_QUOTA_UNITS,
+                "quota_counter": "purge_quota_used",
+            },
+            "label_info": {
+                "create_request": lambda item_id: self.gmailclient.service.users()
+                .labels()
+                .get(userId=user_id, id=item_id),
+                "callback": self.store_label_counts,
+                "uses_batch_http": False,
+                "desc": "Fetching label sizes",
+            },
         }
 
         if operation not in operations:
@@ -292,15 +441,24 @@ class GmailMethod:
         op_config = operations[operation]
 
         # Process in batches with progress tracking
+        # Message IDs are only unpacked to strings one batch at a time
+        if isinstance(items, MessageIdSet):
+            batches = items.chunks(batch_size)
+        else:
+            batches = (
+                items[start_idx : start_idx + batch_size]
+                for start_idx in range(0, len(items), batch_size)
+            )
+
         pbar = tqdm(
-            range(0, len(items), batch_size),
+            enumerate(batches),
+            total=math.ceil(len(items) / batch_size),
             desc=op_config["desc"],
             unit="batch",
         )
 
-        for start_idx in pbar:
-            end_idx = min(start_idx + batch_size, len(items))
-            batch_items = items[start_idx:end_idx]
+        for batch_idx, batch_items in pbar:
+            start_idx = batch_idx * batch_size
 
             # Implement exponential backoff
             max_retries = 5
@@ -320,6 +478,20 @@ class GmailMethod:
                                 counter_name,
                                 getattr(self, counter_name) + len(batch_items),
                             )
+
+                        quota_counter = op_config.get("quota_counter")
+                        if quota_counter:
+                            setattr(
+                                self,
+                                quota_counter,
+                                getattr(self, quota_counter) + op_config["quota_units"],
+                            )
+                            pbar.set_postfix(
+                                {
+                                    "done": processed_count,
+                                    "quota": getattr(self, quota_counter),
+                                }
+                            )
                     else:
                         batch = self.gmailclient.service.new_batch_http_request(
                             callback=op_config.get("callback")
@@ -374,42 +546,60 @@ class GmailMethod:
 
         return processed_count
 
-    def batch_get(self, messages: List[str], user_id: str = "me"):
+    def batch_get(self, messages: MessageIdSet, user_id: str = "me"):
         """
         Process messages in batches to extract sender information.
 
         Args:
-            messages: List of message IDs to process
+            messages: Set of message IDs to process
             user_id: The user's email address (default 'me')
         """
         return self.batch_process(messages, "get", user_id=user_id)
 
-    def batch_delete(self, messages: List[str], user_id: str = "me"):
+    def batch_delete(self, messages: MessageIdSet, user_id: str = "me"):
         """
         Process messages in batches to move them to trash.
 
         Args:
-            messages: List of message IDs to move to trash
+            messages: Set of message IDs to move to trash
             user_id: The user's email address (default 'me')
         """
         return self.batch_process(messages, "trash", user_id=user_id)
 
-    def batch_spam(self, messages: List[str], user_id: str = "me"):
+    def batch_purge(self, messages: MessageIdSet, user_id: str = "me"):
+        """
+        Permanently delete messages in batches, bypassing the trash.
+
+        This cannot be undone. Requires the full-access scope, which is
+        requested on first use.
+
+        Args:
+            messages: Set of message IDs to delete permanently
+            user_id: The user's email address (default 'me')
+
+        Returns:
+            Number of permanently deleted messages
+        """
+        # Authorize up front rather than inside the first batch
+        self._purge_service()
+        return self.batch_process(messages, "purge", user_id=user_id)
+
+    def batch_spam(self, messages: MessageIdSet, user_id: str = "me"):
         """
         Process messages in batches to move them to spam.
 
         Args:
-            messages: List of message IDs to move to spam
+            messages: Set of message IDs to move to spam
             user_id: The user's email address (default 'me')
         """
         return self.batch_process(messages, "spam", user_id=user_id)
 
-    def batch_label(self, messages: List[str], label_id: str, user_id: str = "me"):
+    def batch_label(self, messages: MessageIdSet, label_id: str, user_id: str = "me"):
         """
         Process messages in batches to apply a label.
 
         Args:
-            messages: List of message IDs to label
+            messages: Set of message IDs to label
             label_id: ID of the label to apply
             user_id: The user's email address (default 'me')
 
@@ -418,7 +608,86 @@ class GmailMethod:
         """
         return self.batch_process(messages, "label", user_id=user_id, label_id=label_id)
 
-    def list_messages_matching_query(self, user_id: str, query: str = "") -> List[str]:
+    def list_history(
+        self, user_id: str, start_history_id: str
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        List all mailbox history records since a historyId.
+
+        Args:
+            user_id: The user's email address
+            start_history_id: The historyId to list changes after
+
+        Returns:
+            The history records oldest first, or None if the history is
+            unavailable (e.g. because start_history_id has expired)
+        """
+        try:
+            records = []
+            params = {"userId": user_id, "startHistoryId": start_history_id}
+
+            while True:
+                response = (
+                    self.gmailclient.service.users().history().list(**params).execute()
+                )
+                records.extend(response.get("history", []))
+
+                if "nextPageToken" not in response:
+                    return records
+                params["pageToken"] = response["nextPageToken"]
+
+        except Exception as error:
+            print(f"An error occurred at list_history: {error}")
+            return None
+
+    def _cached_listing(
+        self, user_id: str, key: Tuple[str, str]
+    ) -> Tuple[Optional[MessageIdSet], Optional[str]]:
+        """
+        Look up a listing in the query cache and bring it up to date.
+
+        Args:
+            user_id: The user's email address
+            key: ('query', search query) or ('label', label ID)
+
+        Returns:
+            A tuple of (cached message IDs or None, current mailbox historyId),
+            where the historyId is None if the listing must not be cached
+        """
+        if not is_cacheable(key):
+            return None, None
+
+        history_id = self.get_history_id(user_id)
+        cached = self.query_cache.get(key)
+        if cached is None or history_id is None:
+            return None, history_id
+
+        messages, cached_history_id = cached
+        if cached_history_id != history_id:
+            records = self.list_history(user_id, cached_history_id)
+            if records is not None:
+                messages = apply_history(key, messages, records)
+            else:
+                messages = None
+
+            if messages is None:
+                self.query_cache.discard(key)
+                return None, history_id
+            self.query_cache.put(key, messages, history_id)
+
+        print(f"Using {len(messages)} cached results for '{key[1]}'")
+        return messages, history_id
+
+    def _cache_listing(
+        self, key: Tuple[str, str], messages: MessageIdSet, history_id: Optional[str]
+    ):
+        """Store a fresh listing in the query cache if the historyId is known."""
+        if history_id is not None:
+            self.query_cache.put(key, messages, history_id)
+
+    def list_messages_matching_query(
+        self, user_id: str, query: str = ""
+    ) -> MessageIdSet:
         """
         List message IDs matching a specific query.
 
@@ -427,10 +696,15 @@ class GmailMethod:
             query: The search query (e.g., 'from:example@gmail.com')
 
         Returns:
-            A list of message IDs
+            A set of message IDs
         """
+        key = ("query", query)
+        cached, history_id = self._cached_listing(user_id, key)
+        if cached is not None:
+            return cached
+
         try:
-            messages = []
+            messages = array("Q")
 
             response = (
                 self.gmailclient.service.users()
@@ -443,7 +717,9 @@ class GmailMethod:
                 pbar = tqdm(desc=f"Finding emails matching '{query}'", unit="pages")
                 pbar.update(1)
 
-                messages.extend(message["id"] for message in response["messages"])
+                messages.extend(
+                    MessageIdSet.pack(message["id"]) for message in response["messages"]
+                )
                 pbar.set_postfix({"found": len(messages)})
 
                 while "nextPageToken" in response:
@@ -458,7 +734,8 @@ class GmailMethod:
 
                     if "messages" in response:
                         messages.extend(
-                            message["id"] for message in response["messages"]
+                            MessageIdSet.pack(message["id"])
+                            for message in response["messages"]
                         )
 
                     pbar.update(1)
@@ -469,13 +746,15 @@ class GmailMethod:
 
                 pbar.close()
 
-            return messages
+            message_ids = MessageIdSet(messages)
+            self._cache_listing(key, message_ids, history_id)
+            return message_ids
 
         except Exception as error:
             print(f"An error occurred at list_messages_matching_query: {error}")
-            return []
+            return MessageIdSet()
 
-    def list_messages_matching_label(self, user_id: str, label_id: str) -> List[str]:
+    def list_messages_matching_label(self, user_id: str, label_id: str) -> MessageIdSet:
         """
         List message IDs with a specific label.
 
@@ -484,10 +763,15 @@ class GmailMethod:
             label_id: The label ID
 
         Returns:
-            A list of message IDs
+            A set of message IDs
         """
+        key = ("label", label_id)
+        cached, history_id = self._cached_listing(user_id, key)
+        if cached is not None:
+            return cached
+
         try:
-            messages = []
+            messages = array("Q")
 
             response = (
                 self.gmailclient.service.users()
@@ -502,7 +786,9 @@ class GmailMethod:
                 )
                 pbar.update(1)
 
-                messages.extend(message["id"] for message in response["messages"])
+                messages.extend(
+                    MessageIdSet.pack(message["id"]) for message in response["messages"]
+                )
                 pbar.set_postfix({"found": len(messages)})
 
                 while "nextPageToken" in response:
@@ -516,7 +802,8 @@ class GmailMethod:
 
                     if "messages" in response:
                         messages.extend(
-                            message["id"] for message in response["messages"]
+                            MessageIdSet.pack(message["id"])
+                            for message in response["messages"]
                         )
 
                     pbar.update(1)
@@ -527,31 +814,107 @@ class GmailMethod:
                 if messages:
                     print(f"Found {len(messages)} emails with label '{label_id}'")
 
-            return messages
+            message_ids = MessageIdSet(messages)
+            self._cache_listing(key, message_ids, history_id)
+            return message_ids
 
         except Exception as error:
             print(f"An error occurred at list_messages_matching_label: {error}")
-            return []
+            return MessageIdSet()
 
-    def list_labels(self, user_id: str) -> List[Dict[str, Any]]:
+    def list_labels(self, user_id: str, refresh: bool = False) -> List[Dict[str, Any]]:
         """
         List all available labels.
 
+        The label list is cached together with name and ID indexes and only
+        fetched again when refresh is set or after a label was created.
+
         Args:
             user_id: The user's email address
+            refresh: Fetch the labels again even if they are cached
 
         Returns:
             A list of label objects
         """
+        if self.label_catalog is not None and not refresh:
+            return self.label_catalog
+
         try:
             response = (
                 self.gmailclient.service.users().labels().list(userId=user_id).execute()
             )
-            return response.get("labels", [])
         except Exception as error:
             print(f"An error occurred at list_labels: {error}")
             return []
 
+        self.label_catalog = response.get("labels", [])
+        self.label_ids_by_name = {
+            label["name"]: label["id"] for label in self.label_catalog
+        }
+        self.label_names_by_id = {
+            label["id"]: label["name"] for label in self.label_catalog
+        }
+        return self.label_catalog
+
+    def invalidate_labels(self):
+        """Drop the cached label catalog and label sizes."""
+        self.label_catalog = None
+        self.label_ids_by_name = {}
+        self.label_names_by_id = {}
+        self.label_counts = {}
+        self.label_counts_history_id = None
+
+    def get_label_id(self, user_id: str, label_name: str) -> Optional[str]:
+        """
+        Look up the ID of a label by its name.
+
+        Args:
+            user_id: The user's email address
+            label_name: The label name
+
+        Returns:
+            The label ID, or None if no such label exists
+        """
+        self.list_labels(user_id)
+        return self.label_ids_by_name.get(label_name)
+
+    def get_label_counts(
+        self, user_id: str, label_ids: Optional[List[str]] = None
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Get message and thread totals for labels without listing their messages.
+
+        Counts are kept only while the mailbox historyId stays the same, so
+        new mail and changes from other clients are picked up. Counts that
+        are missing are fetched concurrently with batched labels.get requests.
+
+        Args:
+            user_id: The user's email address
+            label_ids: Label IDs to get counts for (default all labels)
+
+        Returns:
+            A dict mapping label IDs to their messagesTotal and threadsTotal
+        """
+        if label_ids is None:
+            label_ids = [label["id"] for label in self.list_labels(user_id)]
+
+        history_id = self.get_history_id(user_id)
+        if history_id is None or history_id != self.label_counts_history_id:
+            self.label_counts = {}
+            self.label_counts_history_id = history_id
+
+        missing = [
+            label_id for label_id in label_ids if label_id not in self.label_counts
+        ]
+        if missing:
+            self.batch_process(missing, "label_info", user_id=user_id)
+
+        return {
+            label_id: self.label_counts[label_id]
+            for label_id in label_ids
+            if label_id in self.label_counts
+        }
+
     def create_label(self, user_id: str, label_name: str) -> Dict[str, Any]:
         """
         Create a new label.
@@ -578,20 +941,21 @@ class GmailMethod:
                 )
                 .execute()
             )
+            self.invalidate_labels()
             return response
         except Exception as error:
             print(f"An error occurred at create_label: {error}")
             return {}
 
-    def label_check(self, labels: List[Dict[str, Any]], label_name: str) -> bool:
+    def label_check(self, user_id: str, label_name: str) -> bool:
         """
         Check if a label exists.
 
         Args:
-            labels: List of label objects
+            user_id: The user's email address
             label_name: The label name to check
 
         Returns:
             True if the label exists, False otherwise
         """
-        return any(label["name"] == label_name for label in labels)
+        return self.get_label_id(user_id, label_name) is not None
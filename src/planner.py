@@ -0,0 +1,196 @@
+import math
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from daemon import SKIPPED_LABELS
+from idset import MessageIdSet
+from methods import BATCH_DELETE_QUOTA_UNITS, DELETE_BATCH_SIZE
+
+# Messages the user wrote, starred or Gmail marked important are never planned
+PROTECTED_LABELS = SKIPPED_LABELS | {"STARRED", "IMPORTANT"}
+# Shared webmail domains mix personal mail with everything else, so they are
+# only planned for sender by sender
+WEBMAIL_DOMAINS = {
+    "gmail.com",
+    "googlemail.com",
+    "outlook.com",
+    "hotmail.com",
+    "live.com",
+    "msn.com",
+    "yahoo.com",
+    "ymail.com",
+    "icloud.com",
+    "me.com",
+    "mac.com",
+    "aol.com",
+    "proton.me",
+    "protonmail.com",
+    "gmx.com",
+    "gmx.net",
+    "mail.com",
+}
+
+# System labels that describe state rather than a kind of mail
+UNPLANNED_LABELS = {
+    "INBOX",
+    "SENT",
+    "DRAFT",
+    "UNREAD",
+    "IMPORTANT",
+    "STARRED",
+    "TRASH",
+    "SPAM",
+    "CHAT",
+}
+
+
+def quota_cost(count: int) -> int:
+    """
+    Estimate the quota units needed to purge a number of messages.
+
+    Only permanent deletion is planned for: trashed mail keeps counting
+    against storage until the trash is emptied.
+
+    Args:
+        count: Number of messages
+
+    Returns:
+        The quota units the batchDelete requests will use
+    """
+    return math.ceil(count / DELETE_BATCH_SIZE) * BATCH_DELETE_QUOTA_UNITS
+
+
+class ReclaimPlanner:
+    """
+    Ranks senders, domains and labels by the storage their messages take up.
+
+    The planner is fed message metadata rows as a metadata sink during a
+    mailbox scan. It keeps every message's packed ID and size once, and per
+    cleanup target the indexes of the messages belonging to it. Protected
+    messages are counted but never become part of a target.
+    """
+
+    def __init__(self):
+        self.ids = array("Q")
+        self.sizes = array("Q")
+        self.targets: Dict[Tuple[str, str], array] = {}
+        self.protected = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def reset(self):
+        """Forget all scanned messages."""
+        self.ids = array("Q")
+        self.sizes = array("Q")
+        self.targets = {}
+        self.protected = 0
+
+    def write(self, row: Dict[str, Any]):
+        """
+        Add a message to the sender, domain and label targets it belongs to.
+
+        Args:
+            row: A message metadata row as produced by GmailMethod.get_sender
+        """
+        if PROTECTED_LABELS & set(row["labels"]):
+            self.protected += 1
+            return
+
+        keys = [("sender", row["sender"])]
+        if row["domain"] not in WEBMAIL_DOMAINS:
+            keys.append(("domain", row["domain"]))
+        keys.extend(
+            ("label", label) for label in row["labels"] if label not in UNPLANNED_LABELS
+        )
+
+        index = len(self.ids)
+        self.ids.append(MessageIdSet.pack(row["id"]))
+        self.sizes.append(row["size_estimate"])
+        for key in keys:
+            self.targets.setdefault(key, array("L")).append(index)
+
+    def _entry(
+        self, key: Tuple[str, str], claimed: Optional[bytearray] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Total up a target, leaving out messages already claimed by the plan.
+
+        Args:
+            key: (kind, name) of the target
+            claimed: Flags per message index, set for planned messages
+
+        Returns:
+            The target with kind, name, count, bytes, cost and bytes_per_unit,
+            or None if none of its messages are left
+        """
+        members = self.targets[key]
+        if claimed is not None:
+            members = [index for index in members if not claimed[index]]
+        if not members:
+            return None
+
+        total = sum(self.sizes[index] for index in members)
+        cost = quota_cost(len(members))
+        return {
+            "kind": key[0],
+            "name": key[1],
+            "count": len(members),
+            "bytes": total,
+            "cost": cost,
+            "bytes_per_unit": total / cost,
+            "members": members,
+        }
+
+    def rank(self, by: str = "efficiency") -> List[Dict[str, Any]]:
+        """
+        Rank all targets by total size or by bytes freed per quota unit.
+
+        Args:
+            by: 'bytes' or 'efficiency' (bytes per quota unit)
+
+        Returns:
+            A list of targets, best first, each with kind, name, count, bytes
+            and cost
+        """
+        sort_key = "bytes_per_unit" if by == "efficiency" else "bytes"
+        ranking = [self._entry(key) for key in self.targets]
+        ranking.sort(key=lambda target: target[sort_key], reverse=True)
+        return ranking
+
+    def plan(self, limit: int, by: str = "efficiency") -> List[Dict[str, Any]]:
+        """
+        Greedily pick the best target for what is still left, step by step.
+
+        Senders, domains and labels overlap, so after every step all targets
+        are totalled again without the messages planned so far, and the next
+        step is the best of those remaining totals.
+
+        Args:
+            limit: Maximum number of steps
+            by: 'bytes' or 'efficiency' (bytes per quota unit)
+
+        Returns:
+            The plan steps in order, each a ranking entry plus its message IDs
+        """
+        sort_key = "bytes_per_unit" if by == "efficiency" else "bytes"
+        claimed = bytearray(len(self.ids))
+        steps = []
+
+        while len(steps) < limit:
+            best = None
+            for key in self.targets:
+                entry = self._entry(key, claimed)
+                if entry and (best is None or entry[sort_key] > best[sort_key]):
+                    best = entry
+            if best is None:
+                break
+
+            for index in best["members"]:
+                claimed[index] = 1
+            best["messages"] = MessageIdSet(
+                self.ids[index] for index in best["members"]
+            )
+            steps.append(best)
+
+        return steps
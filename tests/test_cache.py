@@ -0,0 +1,120 @@
+from cache import QueryCache, apply_history, is_cacheable
+from idset import MessageIdSet
+
+
+def ids(*message_ids):
+    return MessageIdSet.from_strings(message_ids)
+
+
+def added(message_id, *labels):
+    return {"messagesAdded": [{"message": {"id": message_id, "labelIds": labels}}]}
+
+
+def labels_added(message_id, labels, *added_labels):
+    return {
+        "labelsAdded": [
+            {
+                "message": {"id": message_id, "labelIds": labels},
+                "labelIds": list(added_labels),
+            }
+        ]
+    }
+
+
+def labels_removed(message_id, labels, *removed_labels):
+    return {
+        "labelsRemoved": [
+            {
+                "message": {"id": message_id, "labelIds": labels},
+                "labelIds": list(removed_labels),
+            }
+        ]
+    }
+
+
+def deleted(message_id):
+    return {"messagesDeleted": [{"message": {"id": message_id}}]}
+
+
+def test_label_listing_follows_history():
+    records = [
+        added("c3", "INBOX", "Label_1"),
+        labels_added("a1", ["INBOX", "Label_1", "TRASH"], "TRASH"),
+        labels_removed("a2", ["INBOX"], "Label_1"),
+        deleted("b2"),
+    ]
+
+    updated = apply_history(("label", "Label_1"), ids("a1", "a2", "b2", "d4"), records)
+
+    assert updated == ids("c3", "d4")
+
+
+def test_trash_listing_gains_trashed_messages():
+    records = [labels_added("c3", ["INBOX", "TRASH"], "TRASH")]
+
+    assert apply_history(("label", "TRASH"), ids("a1"), records) == ids("a1", "c3")
+
+
+def test_query_listing_applies_removals():
+    records = [
+        labels_added("a1", ["TRASH"], "TRASH"),
+        labels_added("a2", ["INBOX", "Label_2"], "Label_2"),
+        deleted("a3"),
+    ]
+
+    updated = apply_history(("query", "from:x"), ids("a1", "a2", "a3"), records)
+
+    assert updated == ids("a2")
+
+
+def test_query_listing_goes_stale_on_new_or_restored_mail():
+    key = ("query", "from:x")
+
+    assert apply_history(key, ids("a1"), [added("c3", "INBOX")]) is None
+    restored = labels_removed("a2", ["INBOX"], "TRASH")
+    assert apply_history(key, ids("a1"), [restored]) is None
+
+
+def test_label_dependent_query_goes_stale_on_label_changes():
+    trashed = labels_added("c3", ["INBOX", "TRASH"], "TRASH")
+    labelled = labels_added("c3", ["INBOX", "Label_2"], "Label_2")
+
+    for query in ("in:trash", "in:trash from:x", "is:spam", "label:foo", "in:anywhere"):
+        assert apply_history(("query", query), ids("a1"), [trashed]) is None
+        assert apply_history(("query", query), ids("a1"), [labelled]) is None
+
+    assert apply_history(("query", "in:trash"), ids("a1"), [deleted("a1")]) == ids()
+
+
+def test_time_relative_queries_are_not_cached():
+    cache = QueryCache()
+    cache.put(("query", "from:x newer_than:2d"), ids("a1"), "10")
+
+    assert not is_cacheable(("query", "older_than:1y"))
+    assert is_cacheable(("query", "from:x after:2024/01/01"))
+    assert is_cacheable(("label", "SPAM"))
+    assert cache.get(("query", "from:x newer_than:2d")) is None
+
+
+def test_cache_evicts_least_recently_used():
+    cache = QueryCache(max_entries=2)
+    cache.put(("query", "from:a"), ids("a1"), "1")
+    cache.put(("query", "from:b"), ids("b1"), "1")
+    cache.get(("query", "from:a"))
+    cache.put(("query", "from:c"), ids("c1"), "2")
+
+    assert cache.get(("query", "from:b")) is None
+    assert cache.get(("query", "from:a")) == (ids("a1"), "1")
+    assert cache.get(("query", "from:c")) == (ids("c1"), "2")
+
+
+def test_cache_discard_and_clear():
+    cache = QueryCache()
+    cache.put(("label", "SPAM"), ids("a1"), "1")
+    cache.put(("label", "TRASH"), ids("b1"), "1")
+
+    cache.discard(("label", "SPAM"))
+    assert cache.get(("label", "SPAM")) is None
+
+    cache.clear()
+    assert cache.get(("label", "TRASH")) is None
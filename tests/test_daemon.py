@@ -0,0 +1,163 @@
+import json
+
+import pytest
+
+from daemon import SyncDaemon, load_rules, rule_matches
+from idset import MessageIdSet
+
+IDS = ["18c2f0a1b2c3d4e1", "18c2f0a1b2c3d4e2", "18c2f0a1b2c3d4e3", "18c2f0a1b2c3d4e4"]
+
+
+def row(message_id, sender, *labels):
+    return {
+        "id": message_id,
+        "sender": sender,
+        "domain": sender.rpartition("@")[2].lower(),
+        "labels": list(labels),
+        "size_estimate": 1000,
+    }
+
+
+class FakeGmail:
+    """Records the batch calls the daemon makes instead of sending them."""
+
+    def __init__(self, rows):
+        self.rows = {message["id"]: message for message in rows}
+        self.users = ["earlier@example.com"]
+        self.metadata_sinks = []
+        self.calls = []
+
+    def batch_get(self, messages, user_id):
+        for message_id in messages:
+            self.users.append(self.rows[message_id]["sender"])
+            for sink in self.metadata_sinks:
+                sink.write(self.rows[message_id])
+
+    def batch_delete(self, messages, user_id):
+        self.calls.append(("trash", sorted(messages)))
+
+    def batch_spam(self, messages, user_id):
+        self.calls.append(("spam", sorted(messages)))
+
+    def batch_label(self, messages, label_id, user_id):
+        self.calls.append(("label", label_id, sorted(messages)))
+
+    def get_label_id(self, user_id, label_name):
+        return {"Jobs": "Label_1"}.get(label_name)
+
+    def create_label(self, user_id, label_name):
+        return {"id": f"Label_{label_name}"}
+
+
+def write_rules(tmp_path, rules):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(rules))
+    return str(path)
+
+
+def test_load_rules_accepts_valid_rules(tmp_path):
+    rules = [
+        {"action": "trash", "from": "jobs@example.com"},
+        {"action": "spam", "domain": "spam.example"},
+        {"action": "label", "from": "news", "label": "News"},
+    ]
+
+    assert load_rules(write_rules(tmp_path, rules)) == rules
+
+
+@pytest.mark.parametrize(
+    "rule",
+    [
+        {"action": "delete", "from": "jobs@example.com"},
+        {"from": "jobs@example.com"},
+        {"action": "trash"},
+        {"action": "trash", "from": "", "domain": ""},
+        {"action": "label", "from": "news"},
+    ],
+)
+def test_load_rules_rejects_invalid_rules(tmp_path, rule):
+    with pytest.raises(ValueError):
+        load_rules(write_rules(tmp_path, [rule]))
+
+
+def test_from_matches_a_case_insensitive_substring():
+    message = row(IDS[0], "Jobs@Example.com")
+
+    assert rule_matches({"from": "jobs@example.com"}, message)
+    assert rule_matches({"from": "JOBS"}, message)
+    assert not rule_matches({"from": "news@example.com"}, message)
+
+
+def test_domain_matches_the_whole_domain_only():
+    assert rule_matches({"domain": "Example.com"}, row(IDS[0], "a@example.com"))
+    assert not rule_matches(
+        {"domain": "example.com"}, row(IDS[0], "a@mail.example.com")
+    )
+    assert not rule_matches({"domain": "example.co"}, row(IDS[0], "a@example.com"))
+
+
+def test_from_and_domain_must_both_match():
+    rule = {"from": "jobs", "domain": "example.com"}
+
+    assert rule_matches(rule, row(IDS[0], "jobs@example.com"))
+    assert not rule_matches(rule, row(IDS[0], "jobs@other.com"))
+    assert not rule_matches(rule, row(IDS[0], "news@example.com"))
+
+
+def test_first_trash_or_spam_rule_wins():
+    gmail = FakeGmail(
+        [
+            row(IDS[0], "jobs@example.com", "INBOX"),
+            row(IDS[1], "news@example.com", "INBOX"),
+        ]
+    )
+    rules = [
+        {"action": "spam", "from": "jobs@"},
+        {"action": "trash", "domain": "example.com"},
+        {"action": "spam", "domain": "example.com"},
+    ]
+
+    SyncDaemon(gmail, rules).apply_rules(MessageIdSet.from_strings(IDS[:2]))
+
+    assert gmail.calls == [("spam", [IDS[0]]), ("trash", [IDS[1]])]
+
+
+def test_label_rules_apply_alongside_trash_and_spam():
+    gmail = FakeGmail([row(IDS[0], "jobs@example.com", "INBOX")])
+    rules = [
+        {"action": "trash", "from": "jobs@"},
+        {"action": "label", "from": "jobs@", "label": "Jobs"},
+        {"action": "label", "domain": "example.com", "label": "Example"},
+    ]
+
+    SyncDaemon(gmail, rules).apply_rules(MessageIdSet.from_strings(IDS[:1]))
+
+    assert gmail.calls == [
+        ("trash", [IDS[0]]),
+        ("label", "Label_1", [IDS[0]]),
+        ("label", "Label_Example", [IDS[0]]),
+    ]
+
+
+def test_sent_and_draft_messages_are_skipped():
+    gmail = FakeGmail(
+        [
+            row(IDS[0], "me@example.com", "SENT"),
+            row(IDS[1], "me@example.com", "DRAFT"),
+            row(IDS[2], "me@example.com", "INBOX"),
+        ]
+    )
+    rules = [{"action": "trash", "domain": "example.com"}]
+
+    SyncDaemon(gmail, rules).apply_rules(MessageIdSet.from_strings(IDS[:3]))
+
+    assert gmail.calls == [("trash", [IDS[2]])]
+
+
+def test_sender_statistics_are_left_untouched():
+    gmail = FakeGmail([row(IDS[0], "jobs@example.com", "INBOX")])
+
+    SyncDaemon(gmail, []).apply_rules(MessageIdSet.from_strings(IDS[:1]))
+
+    assert gmail.users == ["earlier@example.com"]
+    assert gmail.metadata_sinks == []
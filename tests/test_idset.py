@@ -0,0 +1,55 @@
+from idset import MessageIdSet
+
+IDS = ["18c2f0a1b2c3d4e5", "18c2f0a1b2c3d4e6", "18c2f0a1b2c3d4f0", "ffffffffffffffff"]
+
+
+def test_round_trip_keeps_ids():
+    id_set = MessageIdSet.from_strings(IDS)
+
+    assert sorted(id_set) == sorted(IDS)
+    assert len(id_set) == len(IDS)
+    assert id_set.nbytes() == 8 * len(IDS)
+
+
+def test_duplicates_and_order_are_normalized():
+    newest_first = list(reversed(IDS))
+    shuffled = [IDS[2], IDS[0], IDS[3], IDS[1], IDS[0]]
+
+    assert MessageIdSet.from_strings(newest_first) == MessageIdSet.from_strings(IDS)
+    assert MessageIdSet.from_strings(shuffled) == MessageIdSet.from_strings(IDS)
+    assert list(MessageIdSet.from_strings(shuffled)) == IDS
+
+
+def test_membership():
+    id_set = MessageIdSet.from_strings(IDS[:2])
+
+    assert IDS[0] in id_set
+    assert IDS[2] not in id_set
+    assert IDS[0] not in MessageIdSet()
+
+
+def test_union():
+    left = MessageIdSet.from_strings(IDS[:3])
+    right = MessageIdSet.from_strings(IDS[1:])
+
+    assert list(left | right) == IDS
+    assert list(left | MessageIdSet()) == IDS[:3]
+    assert list(MessageIdSet() | right) == IDS[1:]
+
+
+def test_difference():
+    left = MessageIdSet.from_strings(IDS)
+    right = MessageIdSet.from_strings([IDS[1], IDS[3], "1"])
+
+    assert list(left - right) == [IDS[0], IDS[2]]
+    assert list(left - MessageIdSet()) == IDS
+    assert not MessageIdSet() - left
+    assert not left - left
+
+
+def test_chunks():
+    id_set = MessageIdSet.from_strings(IDS)
+
+    assert list(id_set.chunks(3)) == [IDS[:3], IDS[3:]]
+    assert list(id_set.chunks(10)) == [IDS]
+    assert list(MessageIdSet().chunks(3)) == []
@@ -0,0 +1,136 @@
+from planner import ReclaimPlanner, quota_cost
+
+
+def message_id(number):
+    return format(0x18C2F0A1B2C30000 + number, "x")
+
+
+def row(number, sender, size, *labels):
+    return {
+        "id": message_id(number),
+        "sender": sender,
+        "domain": sender.rpartition("@")[2],
+        "labels": list(labels),
+        "size_estimate": size,
+    }
+
+
+def planner_with(*rows):
+    planner = ReclaimPlanner()
+    for message in rows:
+        planner.write(message)
+    return planner
+
+
+def targets(steps):
+    return [
+        (step["kind"], step["name"], step["count"], step["bytes"]) for step in steps
+    ]
+
+
+def test_quota_cost_counts_batch_delete_calls():
+    assert quota_cost(1) == 50
+    assert quota_cost(1000) == 50
+    assert quota_cost(1001) == 100
+
+
+def test_protected_messages_are_never_planned():
+    planner = planner_with(
+        row(1, "me@gmail.com", 9000, "SENT", "STARRED"),
+        row(2, "bob@gmail.com", 8000, "INBOX", "IMPORTANT", "STARRED"),
+        row(3, "draft@shop.com", 7000, "DRAFT"),
+        row(4, "deals@shop.com", 1000, "INBOX", "CATEGORY_PROMOTIONS"),
+    )
+
+    steps = planner.plan(3)
+
+    assert planner.protected == 3
+    assert targets(steps) == [("sender", "deals@shop.com", 1, 1000)]
+    assert list(steps[0]["messages"]) == [message_id(4)]
+
+
+def test_webmail_domains_are_only_planned_per_sender():
+    planner = planner_with(
+        row(1, "alice@gmail.com", 5000, "INBOX"),
+        row(2, "bob@gmail.com", 4000, "INBOX"),
+    )
+
+    assert ("domain", "gmail.com") not in planner.targets
+    assert targets(planner.rank("bytes")) == [
+        ("sender", "alice@gmail.com", 1, 5000),
+        ("sender", "bob@gmail.com", 1, 4000),
+    ]
+
+
+def test_state_labels_are_not_targets():
+    planner = planner_with(
+        row(1, "news@example.com", 1000, "INBOX", "UNREAD", "CATEGORY_UPDATES"),
+        row(2, "news@example.com", 1000, "TRASH", "Label_7"),
+    )
+
+    assert set(planner.targets) == {
+        ("sender", "news@example.com"),
+        ("domain", "example.com"),
+        ("label", "CATEGORY_UPDATES"),
+        ("label", "Label_7"),
+    }
+
+
+def test_rank_by_bytes_and_by_efficiency():
+    planner = planner_with(
+        *(row(number, "bulk@list.com", 100) for number in range(1, 1002)),
+        row(2000, "big@files.com", 60000),
+    )
+
+    by_bytes = planner.rank("bytes")
+    by_efficiency = planner.rank()
+
+    assert by_bytes[0]["name"] == "bulk@list.com"
+    assert (by_bytes[0]["bytes"], by_bytes[0]["cost"]) == (100100, 100)
+    assert by_efficiency[0]["name"] == "big@files.com"
+    assert by_efficiency[0]["bytes_per_unit"] == 1200
+
+
+def test_overlapping_targets_are_totalled_without_claimed_messages():
+    planner = planner_with(
+        row(1, "a@shop.com", 6000, "Label_1"),
+        row(2, "b@shop.com", 1000, "Label_2"),
+        row(3, "c@other.com", 5000, "Label_2"),
+    )
+
+    steps = planner.plan(5)
+
+    # Label_2 holds 6000 bytes, but b@shop.com went with the shop.com step
+    assert targets(steps) == [
+        ("domain", "shop.com", 2, 7000),
+        ("label", "Label_2", 1, 5000),
+    ]
+    assert list(steps[1]["messages"]) == [message_id(3)]
+
+
+def test_every_message_is_planned_at_most_once():
+    planner = planner_with(
+        *(
+            row(
+                number, f"user{number % 3}@site{number % 4}.com", number * 10, "Label_1"
+            )
+            for number in range(1, 50)
+        )
+    )
+
+    steps = planner.plan(100)
+    planned = [planned_id for step in steps for planned_id in step["messages"]]
+
+    assert len(planned) == len(set(planned)) == 49
+    assert sum(step["count"] for step in steps) == 49
+    assert sum(step["bytes"] for step in steps) == sum(range(1, 50)) * 10
+
+
+def test_plan_stops_at_the_limit():
+    planner = planner_with(
+        row(1, "a@one.com", 3000),
+        row(2, "b@two.com", 2000),
+        row(3, "c@three.com", 1000),
+    )
+
+    assert [step["bytes"] for step in planner.plan(2)] == [3000, 2000]